@@ -1,8 +1,22 @@
+import matplotlib
+# non-interactive backend, the graphs are only saved to files
+matplotlib.use("Agg")
 from matplotlib import pyplot as plt
 import pickle
 import collections
 
 
+def load_pickle(file_name):
+    """
+    function to load a pickled object, the whole file is read at once and unpickled from memory
+    :param file_name: name of the pickle file
+    :return: unpickled object
+    """
+    with open(file_name, "rb") as handle:
+        data = handle.read()
+    return pickle.loads(data)
+
+
 def graph_plotter(results_dictionary, file_name):
     """
     function to create and save a graph for an article with average computational times for each method
@@ -13,56 +27,49 @@ def graph_plotter(results_dictionary, file_name):
     :return: None
     """
     computational_times = [value[0] for key, value in results_dictionary.items()]
-    plt.bar(results_dictionary.keys(), computational_times)
-    plt.xlabel("Estimation method")
-    plt.ylabel("Computational time [$s$]")
-    plt.tight_layout(True)
-    plt.savefig(file_name, format="eps", dpi=600)
+    fig, ax = plt.subplots(constrained_layout=True)
+    ax.bar(list(results_dictionary.keys()), computational_times)
+    ax.set_xlabel("Estimation method")
+    ax.set_ylabel("Computational time [$s$]")
+    fig.savefig(file_name, format="eps")
+    plt.close(fig)
 
 
 def table(sample_sizes, file_name):
     """
     function to create tex table with average computational times and maximum computational times for each method and
-    for various sample sizes. Data are loaded from pickle files that contains dictionary (key is the method name, value
-    is [average computational time, std dev, maximum computational time]
+    for various sample sizes. Data are loaded from experiments.pickle that contains dictionary (key is the sample size,
+    value is dictionary where key is the method name and value is [average computational time, std dev,
+    maximum computational time]
     :param file_name: name of file where is the tex table saved
-    :param sample_sizes: number that specified pickled file with according sample size.. (i.e. 50 means that
-    "experiment_50.pickle" is going to be load
+    :param sample_sizes: sample sizes of experiments that are put in the table (i.e. 50 means that results of
+    experiment with 50 samples are used)
     :return: None
     """
-    results = {}
-    for size in sample_sizes:
-        with open("experiment_{}.pickle".format(size), "rb") as handle:
-            results[str(size)] = pickle.load(handle)
-        handle.close()
-    result_by_method = dict.fromkeys(results[str(size)].keys(), [])
-
-    counter = 0
-    print(results)
+    experiments = load_pickle("experiments.pickle")
+    results = {str(size): experiments[size] for size in sample_sizes}
+    result_by_method = {method: [] for method in results[str(sample_sizes[-1])].keys()}
+
+    lines = [r"\begin{table}[]" + "\n", r"\centering" + "\n"]
+    s = '|{}|'.format('|'.join('c' for _ in range(len(sample_sizes) * 2 + 1)))
+    lines.append(r"\begin{tabular}{" + s + "}" + "\n")
+    lines.append(r"\hline" + "\n")
+    s = "{}".format("& \multicolumn{2}{c|}{$n = ".join(str(n) + "$}" for n in sample_sizes))
+    lines.append(r"\multirow{2}{*}{method} & \multicolumn{2}{c|}{$n =  " + s
+                 + r"\\ \cline{2 -" + str(len(sample_sizes) * 2 + 1) + "}" + "\n")
+    s = "{}".format(" & ".join("$CT_{avg}$ & $CT_{max}$" for _ in range(len(sample_sizes))))
+    lines.append(r" & " + s + r"\\ \hline" + "\n")
+    for method in result_by_method:
+        row = [method]
+        row.extend(rf" & ${1000000 * dicts[method][0]:.2f}$ & ${1000000 * dicts[method][2]:.2f}$ "
+                   .replace("e-0", "\cdot 10^{-") for dicts in results.values())
+        row.append(r" \\ \hline" + "\n")
+        lines.append("".join(row))
+    lines.append(r"\end{tabular}" + "\n")
+    lines.append(r"\end{table}" + "\n")
 
     with open(file_name, "w") as f:
-        f.writelines(r"\begin{table}[]" + "\n")
-        f.writelines(r"\centering" + "\n")
-        s = '|{}|'.format('|'.join('c' for _ in range(len(sample_sizes) * 2 + 1)))
-        f.writelines(r"\begin{tabular}{" + s + "}" + "\n")
-        f.writelines(r"\hline" + "\n")
-        s = "{}".format("& \multicolumn{2}{c|}{$n = ".join(str(n) + "$}" for n in sample_sizes))
-        f.writelines(r"\multirow{2}{*}{method} & \multicolumn{2}{c|}{$n =  " + s
-                     + r"\\ \cline{2 -" + str(len(sample_sizes) * 2 + 1) + "}" + "\n")
-        s = "{}".format(" & ".join("$CT_{avg}$ & $CT_{max}$" for _ in range(len(sample_sizes))))
-        f.writelines(r" & " + s + r"\\ \hline" + "\n")
-        for method in result_by_method:
-            s = method
-            for sample_number, dicts in results.items():
-                s = s + r" & ${:.2f}$ & ${:.2f}$ ".format(1000000 * dicts[method][0],
-                                                              1000000 * dicts[method][2]).replace("e-0", "\cdot 10^{-")
-                print(s)
-            s = s + r" \\ \hline" + "\n"
-            f.write(s)
-        f.writelines(r"\end{tabular}" + "\n")
-        f.writelines(r"\end{table}" + "\n")
-    f.close()
-    print(result_by_method)
+        f.write("".join(lines))
 
 def table_maker(results_dictionary, file_name):
     """
@@ -72,55 +79,53 @@ def table_maker(results_dictionary, file_name):
     :param file_name: name of plain text with with latex table
     :return: None
     """
+    lines = [r"\begin{table}[]" + "\n",
+             r"\centering" + "\n",
+             r"\begin{tabular}{|c|c|c|}" + "\n",
+             r"\hline" + "\n",
+             r"Method & $\overline{CT}$ & $\sigma_{CT}$" + "$CT_{max}$" + "\n",
+             r"\hline" + "\n"]
+    for key, value in results_dictionary.items():
+        lines.append(rf"{key} & {1000 * value[0]:.2e} &  {1000 * value[1]:.2e} & {1000 * value[2]:.2e}\\ \hline" + "\n")
+    lines.append(r"\end{tabular}" + "\n")
+    lines.append(r"\end{table}" + "\n")
+
     with open(file_name, "w") as f:
-        f.writelines(r"\begin{table}[]" + "\n")
-        f.writelines(r"\centering" + "\n")
-        f.writelines(r"\begin{tabular}{|c|c|c|}" + "\n")
-        f.writelines(r"\hline" + "\n")
-        f.writelines(r"Method & $\overline{CT}$ & $\sigma_{CT}$" + "$CT_{max}$" + "\n")
-        f.writelines(r"\hline" + "\n")
-        for key in results_dictionary.keys():
-            f.writelines(key + (r" & {:.2e} &  {:.2e} & {:.2e}\\ \hline".format(1000 * results_dictionary[key][0],
-                                                                                 1000 *results_dictionary[key][1],
-                                                                                 1000 * results_dictionary[key][2])) + "\n")
-        f.writelines(r"\end{tabular}" + "\n")
-        f.writelines(r"\end{table}" + "\n")
-
-    f.close()
+        f.write("".join(lines))
 
 
 def graph_plotter_ext(sample_sizes, file_name):
     """
     function to create graph with average computational times times for each method and
-    for various sample sizes. Data are loaded from pickle files that contains dictionary (key is the method name,
-    value is [average computational time, std dev, maximum computational time]
+    for various sample sizes. Data are loaded from experiments.pickle that contains dictionary (key is the sample size,
+    value is dictionary where key is the method name and value is [average computational time, std dev,
+    maximum computational time]
     :param file_name: name of file where is the tex table saved
-    :param sample_sizes: number that specified pickled file with according sample size.. (i.e. 50 means that
-    "experiment_50.pickle" is going to be load
+    :param sample_sizes: sample sizes of experiments that are plotted (i.e. 50 means that results of
+    experiment with 50 samples are used)
     :return: None
     """
+    experiments = load_pickle("experiments.pickle")
     results = {}
     x_labels = []
     for size in sample_sizes:
         x_labels.append(int(size))
-        with open("experiment_{}.pickle".format(size), "rb") as handle:
-            results[str(size)] = pickle.load(handle)
-        handle.close()
-    result_by_method = dict.fromkeys(results[str(size)].keys(), [])
+        results[str(size)] = experiments[size]
+    result_by_method = {method: [] for method in results[str(size)].keys()}
     for method in result_by_method:
         s = method
         for sample_number, dicts in results.items():
-            s = s + r" & ${:.2f}$ & ${:.2f}$ ".format(1000000 * dicts[method][0],
-                                                      1000000 * dicts[method][2]).replace("e-0", "\cdot 10^{-")
+            s = s + (rf" & ${1000000 * dicts[method][0]:.2f}$ & ${1000000 * dicts[method][2]:.2f}$ "
+                     .replace("e-0", "\cdot 10^{-"))
             print(s)
 
 def table_error_comparison(params,sample_sizes, file_name):
     """
     function to create tex table with MSE errors comparison for each method and
-    for various sample sizes. Data are loaded from pickle files that contains dictionary (key is the method name, value
-    is [mse_alpha, mse_gamma]
+    for various sample sizes. Data are loaded from errors.pickle that contains dictionary (key is the tuple
+    (alpha, gamma, sample size), value is dictionary where key is the method name and value is [mse_alpha, mse_gamma]
     :param file_name: name of file where is the tex table saved
-    :param sample_sizes: number that specified pickled file with according sample size.. (i.e. 50 means that
+    :param sample_sizes: sample sizes of experiments that are put in the table
     :param params: array with parameter values
     :return: None
     """
@@ -136,53 +141,52 @@ def table_error_comparison(params,sample_sizes, file_name):
         "mm4": []
     }
 
+    errors = load_pickle("errors.pickle")
     for size in sample_sizes:
         for parset in params:
-            with open("errors_params_{}_{}_samplesize_{}.pickle".format(parset[0], parset[1], size), "rb") as handle:
-                dict = pickle.load(handle)
-                for key,val in dict.items():
-                    results[key].append(val)
-            handle.close()
+            dict = errors[(parset[0], parset[1], size)]
+            for key,val in dict.items():
+                results[key].append(val)
             results["size"].append(size)
             results["params"].append(parset)
 
 
-    with open(file_name, "w") as f:
-        # Header
-        f.writelines(r"\begin{table}"+"\n")
-        f.writelines(r"\centering"+"\n")
-        f.writelines(r"\begin{tabular}{| c | c  c | c | c c |}"+"\n")
-        f.writelines(r"\hline"+"\n")
-        f.writelines(r"\multirow{2}{*}{n} & \multicolumn{2}{| c |}{True Values} & \multirow{2}{*}{Method} &  \multicolumn{2}{| c |}{MSE} \\"+"\n")
-        f.writelines(r"& $\alpha$ & $\gamma$ & & $\alpha$ & $\gamma$ \\"+"\n")
-        f.writelines(r"\hline"+"\n")
+    # Header
+    lines = [r"\begin{table}"+"\n",
+             r"\centering"+"\n",
+             r"\begin{tabular}{| c | c  c | c | c c |}"+"\n",
+             r"\hline"+"\n",
+             r"\multirow{2}{*}{n} & \multicolumn{2}{| c |}{True Values} & \multirow{2}{*}{Method} &  \multicolumn{2}{| c |}{MSE} \\"+"\n",
+             r"& $\alpha$ & $\gamma$ & & $\alpha$ & $\gamma$ \\"+"\n",
+             r"\hline"+"\n"]
 
-        counter = 0
-        for i in range(len(results["size"])):
-            f.writelines(r"\multirow{7}{*}{"+ str(results["size"][i]) +r"} & ")
-            f.writelines(r"\multirow{7}{*}{" + str(results["params"][i][0]) +r"} & ")
-            f.writelines(r"\multirow{7}{*}{" + str(results["params"][i][1]) +r"} & ")
-            # s_repeated = "{} & {} & {}".format(results["size"][i], results["params"][i][0], results["params"][i][1])
-            for key in list(results.keys())[2:]:
-                counter += 1
-                if key == "umvue":
-                    s = r"{} & {:.2e} & {:.2e} \\".format(key, results[key][i][0], results[key][i][1]) + "\n"
-                else:
-                    s = r"& & & {} & {:.2e} & {:.2e} \\".format(key, results[key][i][0], results[key][i][1]) + "\n"
-                f.writelines(s)
-            f.write(r"\hline"+"\n")
-        f.writelines(r"\end{tabular}" + "\n")
-        f.writelines(r"\end{table}" + "\n")
-
-    f.close()
+    counter = 0
+    for i in range(len(results["size"])):
+        lines.append(r"\multirow{7}{*}{"+ str(results["size"][i]) +r"} & ")
+        lines.append(r"\multirow{7}{*}{" + str(results["params"][i][0]) +r"} & ")
+        lines.append(r"\multirow{7}{*}{" + str(results["params"][i][1]) +r"} & ")
+        # s_repeated = "{} & {} & {}".format(results["size"][i], results["params"][i][0], results["params"][i][1])
+        for key in list(results.keys())[2:]:
+            counter += 1
+            if key == "umvue":
+                s = rf"{key} & {results[key][i][0]:.2e} & {results[key][i][1]:.2e} \\" + "\n"
+            else:
+                s = rf"& & & {key} & {results[key][i][0]:.2e} & {results[key][i][1]:.2e} \\" + "\n"
+            lines.append(s)
+        lines.append(r"\hline"+"\n")
+    lines.append(r"\end{tabular}" + "\n")
+    lines.append(r"\end{table}" + "\n")
+
+    with open(file_name, "w") as f:
+        f.write("".join(lines))
 
 def table_error_comparison_split(params,sample_sizes, file_name):
     """
     function to create tex tables (divided by sample size) with MSE errors comparison for each method and
-    for various sample sizes. Data are loaded from pickle files that contains dictionary (key is the method name, value
-    is [mse_alpha, mse_gamma]
+    for various sample sizes. Data are loaded from errors.pickle that contains dictionary (key is the tuple
+    (alpha, gamma, sample size), value is dictionary where key is the method name and value is [mse_alpha, mse_gamma]
     :param file_name: name of file where is the tex table saved
-    :param sample_sizes: number that specified pickled file with according sample size.. (i.e. 50 means that
+    :param sample_sizes: sample sizes of experiments that are put in the table
     :param params: array with parameter values
     :return: None
     """
@@ -198,58 +202,52 @@ def table_error_comparison_split(params,sample_sizes, file_name):
         "mm4": []
     }
 
-    with open(file_name, "w") as f:
-        pass
-    f.close()
-
+    lines = []
+    errors = load_pickle("errors.pickle")
     for size in sample_sizes:
         for parset in params:
-            with open("errors_params_{}_{}_samplesize_{}.pickle".format(parset[0], parset[1], size), "rb") as handle:
-                dict = pickle.load(handle)
-                for key,val in dict.items():
-                    results[key] = val
-            handle.close()
+            dict = errors[(parset[0], parset[1], size)]
+            for key,val in dict.items():
+                results[key] = val
             results["size"] = size
             results["params"] = parset
 
+        # Header
+        lines.append(r"\begin{table}"+"\n")
+        lines.append(r"\centering"+"\n")
+        lines.append(r"\begin{tabular}{| c | c  c | c | c c |}"+"\n")
+        lines.append(r"\hline"+"\n")
+        lines.append(r"\multirow{2}{*}{n} & \multicolumn{2}{| c |}{True Values} & \multirow{2}{*}{Method} &  \multicolumn{2}{| c |}{MSE} \\"+"\n")
+        lines.append(r"& $\alpha$ & $\gamma$ & & $\alpha$ & $\gamma$ \\"+"\n")
+        lines.append(r"\hline"+"\n")
 
-        with open(file_name, "a") as f:
-            # Header
-            f.writelines(r"\begin{table}"+"\n")
-            f.writelines(r"\centering"+"\n")
-            f.writelines(r"\begin{tabular}{| c | c  c | c | c c |}"+"\n")
-            f.writelines(r"\hline"+"\n")
-            f.writelines(r"\multirow{2}{*}{n} & \multicolumn{2}{| c |}{True Values} & \multirow{2}{*}{Method} &  \multicolumn{2}{| c |}{MSE} \\"+"\n")
-            f.writelines(r"& $\alpha$ & $\gamma$ & & $\alpha$ & $\gamma$ \\"+"\n")
-            f.writelines(r"\hline"+"\n")
-
-            counter = 0
-
-            f.writelines(r"\multirow{7}{*}{"+ str(results["size"]) +r"} & ")
-            f.writelines(r"\multirow{7}{*}{" + str(results["params"][0]) +r"} & ")
-            f.writelines(r"\multirow{7}{*}{" + str(results["params"][1]) +r"} & ")
-            # s_repeated = "{} & {} & {}".format(results["size"][i], results["params"][i][0], results["params"][i][1])
-            for key in list(results.keys())[2:]:
-                counter += 1
-                if key == "umvue":
-                    s = r"{} & {:.2e} & {:.2e} \\".format(key, results[key][0], results[key][1]) + "\n"
-                else:
-                    s = r"& & & {} & {:.2e} & {:.2e} \\".format(key, results[key][0], results[key][1]) + "\n"
-                f.writelines(s)
-            f.write(r"\hline"+"\n")
-            f.writelines(r"\end{tabular}" + "\n")
-            f.writelines(r"\end{table}" + "\n")
-
-        f.close()
+        counter = 0
 
+        lines.append(r"\multirow{7}{*}{"+ str(results["size"]) +r"} & ")
+        lines.append(r"\multirow{7}{*}{" + str(results["params"][0]) +r"} & ")
+        lines.append(r"\multirow{7}{*}{" + str(results["params"][1]) +r"} & ")
+        # s_repeated = "{} & {} & {}".format(results["size"][i], results["params"][i][0], results["params"][i][1])
+        for key in list(results.keys())[2:]:
+            counter += 1
+            if key == "umvue":
+                s = rf"{key} & {results[key][0]:.2e} & {results[key][1]:.2e} \\" + "\n"
+            else:
+                s = rf"& & & {key} & {results[key][0]:.2e} & {results[key][1]:.2e} \\" + "\n"
+            lines.append(s)
+        lines.append(r"\hline"+"\n")
+        lines.append(r"\end{tabular}" + "\n")
+        lines.append(r"\end{table}" + "\n")
 
-sample_sizes = [100]
-params = [2,1]
-sample_sizes = [50,100]
-params = [[2,1],[4,1],[5,3]]
+    with open(file_name, "w") as f:
+        f.write("".join(lines))
 
-# table(sample_sizes, "example.tex")
-# graph_plotter_ext(sample_sizes, "graph.eps")
-table_error_comparison(params,sample_sizes,"example_errors.tex")
 
+if __name__ == "__main__":
+    sample_sizes = [100]
+    params = [2,1]
+    sample_sizes = [50,100]
+    params = [[2,1],[4,1],[5,3]]
 
+    # table(sample_sizes, "example.tex")
+    # graph_plotter_ext(sample_sizes, "graph.eps")
+    table_error_comparison(params,sample_sizes,"example_errors.tex")
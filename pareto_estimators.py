@@ -1,91 +1,170 @@
 from scipy.stats import pareto
-from scipy.stats import hmean
-from functools import wraps
-from timeit import default_timer as time
+from time import perf_counter_ns
 import numpy as np
 import pickle
+import tempfile
+import os
+import re
 
 
-def measure_time(f):
+# seeded generator so that the experiments are reproducible
+rng = np.random.default_rng(0)
+
+
+def get_pareto_data(shape, location, number_of_data, dtype=np.float64):
     """
-    decorating function to measure time of function f execution
-    :param f: function whose time is measured
-    :return: the results of function f and total time of its execution
+    function to generate data from Pareto distribution specified by shape (alpha) and location (gamma) parameters
+    :param shape: alpha parameter of pareto distribution
+    :param location: gamma parameter of pareto distribution
+    :param number_of_data: number of data samples to generate, or shape of the generated array (i.e.
+    (number of experiments, number of samples) to draw samples of all experiments at once)
+    :param dtype: floating point type of the samples, np.float32 halves the memory traffic of the estimators
+    :return: numpy.ndarray with samples from pareto distribution specified by :param shape and :param location.
     """
+    # X = gamma * exp(E / alpha) with E standard exponential is Pareto I used by scipy.stats.pareto, the exponential
+    # sampler and the vectorised exp are faster than rng.pareto (Lomax samples that are shifted and scaled)
+    # in-place to avoid temporaries, the array can hold samples of all experiments
+    data = rng.standard_exponential(size=number_of_data, dtype=dtype)
+    data /= shape
+    np.exp(data, out=data)
+    data *= location
+    return data
 
-    # noinspection PyShadowingNames
-    @wraps(f)
-    def wrapper(*args, **kwargs):
-        start = time()
-        result = f(*args, **kwargs)
-#        print(result)
-        end = time()
-        duration = end - start
-        # print('Elapsed time: {} seconds'.format(duration) + ' for function ' + f.__name__)
-        if f.__name__ not in results_dict.keys():
-            results_dict[f.__name__] = [[result, duration]]
-        else:
-            results_dict[f.__name__].append([result, duration])
-        return result, duration
 
-    return wrapper
+def dump_pickle(file_name, obj):
+    """
+    function to pickle obj into file_name atomically, obj is dumped to a temporary file in the same directory that
+    replaces file_name only after the dump succeeded, so an interrupted run does not destroy the stored results
+    :param file_name: name of the pickle file
+    :param obj: object to store
+    :return: None
+    """
+    handle, temporary_name = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(file_name)), suffix=".tmp")
+    try:
+        with os.fdopen(handle, "wb") as f:
+            pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+        # mkstemp creates the file readable by the owner only, the stored file gets the mode open() would give it
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(temporary_name, 0o666 & ~umask)
+        os.replace(temporary_name, file_name)
+    except BaseException:
+        os.remove(temporary_name)
+        raise
+
+
+def update_pickle(file_name, key, value):
+    """
+    function to store value under key in a dictionary pickled in file_name, so results of all experiments are kept
+    in a single file that is loaded at once. The file is read, updated and replaced, runs that update the same file
+    must not overlap otherwise results of one of them are lost
+    :param file_name: name of the pickle file with the dictionary, it is created if it does not exist
+    :param key: key under which the value is stored
+    :param value: object to store
+    :return: None
+    """
+    try:
+        with open(file_name, "rb") as handle:
+            stored = pickle.load(handle)
+    except FileNotFoundError:
+        stored = {}
+    stored[key] = value
+    dump_pickle(file_name, stored)
 
 
-@measure_time
-def dummy_estimator(data_series):
+def merge_legacy_pickles(directory="."):
     """
-    dummy function to illustrate how to work with @measure_time decorator
-    :param data_series: samples from pareto distribution that are used to estimate its parameters
-    :return: it should return the shape and location parameters, now it returns dummy tuple
+    one-off function to merge results stored by older versions of this script in one pickle per run
+    (experiment_{size}.pickle and errors_params_{alpha}_{gamma}_samplesize_{size}.pickle) into experiments.pickle and
+    errors.pickle, results already stored in experiments.pickle and errors.pickle are kept. The old files are not
+    removed
+    :param directory: directory with the pickle files
+    :return: None
+    """
+    def number(text):
+        return int(text) if text.isdigit() else float(text)
+
+    def merge(file_name, legacy):
+        file_name = os.path.join(directory, file_name)
+        try:
+            with open(file_name, "rb") as handle:
+                legacy.update(pickle.load(handle))
+        except FileNotFoundError:
+            pass
+        dump_pickle(file_name, legacy)
+
+    experiments = {}
+    errors = {}
+    for file_name in os.listdir(directory):
+        match = re.fullmatch(r"experiment_(.+)\.pickle", file_name)
+        if match:
+            with open(os.path.join(directory, file_name), "rb") as handle:
+                experiments[number(match.group(1))] = pickle.load(handle)
+        match = re.fullmatch(r"errors_params_(.+)_(.+)_samplesize_(.+)\.pickle", file_name)
+        if match:
+            with open(os.path.join(directory, file_name), "rb") as handle:
+                errors[tuple(number(group) for group in match.groups())] = pickle.load(handle)
+    merge("experiments.pickle", experiments)
+    merge("errors.pickle", errors)
+
+
+def log_ratio_sum(data_series, location):
+    """
+    function to compute sum(log(x / location)) over the samples in log-space as sum(log(x)) - n * log(location),
+    so no normalised copy of the samples is allocated and data_series itself is left untouched
+    :param data_series: samples from pareto distribution, 2-D array holds samples of one experiment per row
+    :param location: value the samples are divided by (i.e. minimum of the samples), one value per row for 2-D array
+    :return: sum of logarithms of data_series divided by location, computed over the last axis
     """
-    return min(data_series), max(data_series)
+    return np.log(data_series).sum(axis=-1) - data_series.shape[-1] * np.log(location)
 
 
-def get_pareto_data(shape, location, number_of_data):
+def mean_and_variance(data_series):
     """
-    function to generate data from Pareto distribution specified by shape (alpha) and location (gamma) parameters
-    :param shape: alpha parameter of pareto distribution
-    :param location: gamma parameter of pareto distribution
-    :param number_of_data: number of data samples to generate
-    :return: numpy.ndarray with samples from pareto distribution specified by :param shape and :param location.
+    function to compute the sample mean and the (biased) sample variance as E[X^2] - E[X]^2, the sum of squares is
+    reduced by einsum without any temporary array. The difference cancels, its relative error grows with
+    E[X^2] / Var[X] = (alpha - 1)^2 (i.e. 16 for alpha = 5, 2401 for alpha = 50), so the sums are accumulated in
+    float64 also for float32 samples
+    :param data_series: samples from pareto distribution, 2-D array holds samples of one experiment per row
+    :return: tuple (mean, variance) of data_series computed over the last axis (float64)
     """
-    data = pareto.rvs(shape, scale=location, size=number_of_data)
-    return data
+    t = data_series.mean(axis=-1, dtype=np.float64)
+    s2 = np.einsum("...i,...i->...", data_series, data_series, dtype=np.float64) / data_series.shape[-1] - t * t
+    return t, s2
 
 
-@measure_time
 def umvue_estimator(data_series):
     """
     function that implements uniformly minimum variance unbiased estimators for Pareto distribution
     (ESTIMATION OF THE SHAPE AND location PARAMETERS OF THE PARETO DISTRIBUTION USING EXTREME RANKED SET SAMPLING)
-    :param data_series: samples from pareto distribution that are used to estimate its parameters
-    :return: tuple (alpha, gamma) that contains estimated parameters of Pareto distribution
+    :param data_series: samples from pareto distribution that are used to estimate its parameters, 2-D array holds
+    samples of one experiment per row
+    :return: tuple (alpha, gamma) that contains estimated parameters of Pareto distribution (arrays with estimates of
+    each experiment for 2-D data_series)
     """
-    n = len(data_series)
-    x1 = min(data_series)
-    data_series = data_series / x1
-    triple_dot_alpha = n * (np.sum(np.log(data_series)) ** - 1)
+    n = data_series.shape[-1]
+    x1 = data_series.min(axis=-1)
+    triple_dot_alpha = n / log_ratio_sum(data_series, x1)
     alpha = (1 - 2 * (n ** -1)) * triple_dot_alpha
     gamma = (1 - ((n - 1) ** - 1) * triple_dot_alpha ** -1) * x1
     return alpha, gamma
 
 
-@measure_time
 def ml_estimator(data_series):
     """
     function that implements the maximum likelihood estimator as closed solution
     (ESTIMATION OF THE SHAPE AND location PARAMETERS OF THE PARETO DISTRIBUTION USING EXTREME RANKED SET SAMPLING)
-    :param data_series: samples from pareto distribution that are used to estimate its parameters
-    :return: tuple (alpha, gamma) that contains estimated parameters of Pareto distribution
+    :param data_series: samples from pareto distribution that are used to estimate its parameters, 2-D array holds
+    samples of one experiment per row
+    :return: tuple (alpha, gamma) that contains estimated parameters of Pareto distribution (arrays with estimates of
+    each experiment for 2-D data_series)
     """
-    n = len(data_series)
-    gamma = min(data_series)
-    data_series = data_series / gamma
-    alpha = n * (np.sum(np.log(data_series)) ** - 1)
+    n = data_series.shape[-1]
+    gamma = data_series.min(axis=-1)
+    alpha = n / log_ratio_sum(data_series, gamma)
     return alpha, gamma
 
 
-@measure_time
 def maximum_likelihood_estimator_scipy(data_series):
     """
     wrapper for scipy default ML estimator
@@ -96,66 +175,73 @@ def maximum_likelihood_estimator_scipy(data_series):
     return params[0], params[2]
 
 
-@measure_time
 def mom_estimator(data_series):
     """
     function that implements the Method of Moments estimator
     (Parameter estimation of Pareto distribution: some modified moment estimators)
-    :param data_series: samples from pareto distribution that are used to estimate its parameters
-    :return: tuple (alpha, gamma) that contains estimated parameters of Pareto distribution
+    :param data_series: samples from pareto distribution that are used to estimate its parameters, 2-D array holds
+    samples of one experiment per row
+    :return: tuple (alpha, gamma) that contains estimated parameters of Pareto distribution (arrays with estimates of
+    each experiment for 2-D data_series)
     """
-    t = np.mean(data_series)
-    s2 = np.var(data_series)
-    s = np.sqrt(s2)
-    alpha = 1 + np.sqrt(1 + (t ** 2) / s2)
-    gamma = np.sqrt(s2 + t ** 2) / (s + np.sqrt(s2 + t ** 2)) * t
+    t, s2 = mean_and_variance(data_series)
+    s = s2 ** 0.5
+    t2 = t ** 2
+    root = (s2 + t2) ** 0.5
+    alpha = 1 + (1 + t2 / s2) ** 0.5
+    gamma = root / (s + root) * t
     return alpha, gamma
 
 
-@measure_time
 def mm1_estimator(data_series):
     """
     function that implements the first modification of Method of Moments estimator
     (Parameter estimation of Pareto distribution: some modified moment estimators)
-    :param data_series: samples from pareto distribution that are used to estimate its parameters
-    :return: tuple (alpha, gamma) that contains estimated parameters of Pareto distribution
+    :param data_series: samples from pareto distribution that are used to estimate its parameters, 2-D array holds
+    samples of one experiment per row
+    :return: tuple (alpha, gamma) that contains estimated parameters of Pareto distribution (arrays with estimates of
+    each experiment for 2-D data_series)
     """
-    s2 = np.var(data_series)
-    s = np.sqrt(s2)
-    t2 = np.mean(data_series) ** 2
-    alpha = 1 + np.sqrt(1 + t2 / s2)
-    gamma = np.sqrt((s2 + t2) * (np.sqrt(s2 + t2) - s) / (s + np.sqrt(s2 + t2)))
+    t, s2 = mean_and_variance(data_series)
+    s = s2 ** 0.5
+    t2 = t ** 2
+    root = (s2 + t2) ** 0.5
+    alpha = 1 + (1 + t2 / s2) ** 0.5
+    gamma = ((s2 + t2) * (root - s) / (s + root)) ** 0.5
     return alpha, gamma
 
 
-@measure_time
 def mm2_estimator(data_series):
     """
     function that implements the second modification of Method of Moments estimator
     (Parameter estimation of Pareto distribution: some modified moment estimators)
-    :param data_series: samples from pareto distribution that are used to estimate its parameters
-    :return: tuple (alpha, gamma) that contains estimated parameters of Pareto distribution
+    :param data_series: samples from pareto distribution that are used to estimate its parameters, 2-D array holds
+    samples of one experiment per row
+    :return: tuple (alpha, gamma) that contains estimated parameters of Pareto distribution (arrays with estimates of
+    each experiment for 2-D data_series)
     """
-    hm = hmean(data_series)
-    t = np.mean(data_series)
+    hm = data_series.shape[-1] / np.reciprocal(data_series).sum(axis=-1)
+    t = data_series.mean(axis=-1)
+    root = (t + hm) ** 0.5
 
-    alpha = np.sqrt(1 + hm / t)
-    gamma = np.sqrt(t + hm) * hm / (np.sqrt(t) + np.sqrt(t + hm))
+    alpha = (1 + hm / t) ** 0.5
+    gamma = root * hm / (t ** 0.5 + root)
 
     return alpha, gamma
 
 
-@measure_time
 def mm3_estimator(data_series):
     """
     function that implements the third modification of Method of Moments estimator
     (Parameter estimation of Pareto distribution: some modified moment estimators)
-    :param data_series: samples from pareto distribution that are used to estimate its parameters
-    :return: tuple (alpha, gamma) that contains estimated parameters of Pareto distribution
+    :param data_series: samples from pareto distribution that are used to estimate its parameters, 2-D array holds
+    samples of one experiment per row
+    :return: tuple (alpha, gamma) that contains estimated parameters of Pareto distribution (arrays with estimates of
+    each experiment for 2-D data_series)
     """
-    t1 = min(data_series)
-    n = len(data_series)
-    t = np.mean(data_series)
+    t1 = data_series.min(axis=-1)
+    n = data_series.shape[-1]
+    t = data_series.mean(axis=-1)
 
     alpha = (t1 - n * t) / (n * (t1 - t))
     gamma = t1 - t1 / (n * alpha)
@@ -163,60 +249,86 @@ def mm3_estimator(data_series):
     return alpha, gamma
 
 
-@measure_time
 def mm4_estimator(data_series):
     """
     function that implements the fourth modification of Method of Moments estimator
     (Parameter estimation of Pareto distribution: some modified moment estimators)
-    :param data_series: samples from pareto distribution that are used to estimate its parameters
-    :return: tuple (alpha, gamma) that contains estimated parameters of Pareto distribution
+    :param data_series: samples from pareto distribution that are used to estimate its parameters, 2-D array holds
+    samples of one experiment per row
+    :return: tuple (alpha, gamma) that contains estimated parameters of Pareto distribution (arrays with estimates of
+    each experiment for 2-D data_series)
     """
-    t1 = min(data_series)
-    n = len(data_series)
-    t = np.mean(data_series)
+    t1 = data_series.min(axis=-1)
+    n = data_series.shape[-1]
+    t = data_series.mean(axis=-1)
     alpha = ((n - 1) * t) / (n * (t - t1))
     gamma = t1 * (n / (n + 1)) ** (1 / alpha)
     return alpha, gamma
 
 
-results_dict = {}
-pareto_shape = 5
-pareto_location = 3
-experiments_number = 10000
-data_quantity = 5000
-function_names = ["umvue_estimator", "ml_estimator", "mom_estimator", "mm1_estimator", "mm2_estimator", "mm3_estimator",
-                  "mm4_estimator"]
-
-for experiment in range(experiments_number):
-    for function_name in function_names:
-        pareto_data = get_pareto_data(pareto_shape, pareto_location, data_quantity)
-        eval(function_name + "(pareto_data)")
-
-    if experiment % 100 == 99:
-        print("Evaluated {:.2%} experiments".format((experiment + 1) / experiments_number))
-
-avg_results = {}
-avg_errors = {}
-for k in results_dict.keys():
-
-    if "scipy" not in k:
-        total_time = []
-        parameter_results = {"alpha": [], "gamma": []}
-        for result in results_dict[k]:
-            total_time.append(result[1])
-            parameter_results["alpha"].append(result[0][0])
-            parameter_results["gamma"].append(result[0][1])
-        avg_results[k.replace("_estimator", "")] = [np.average(total_time), np.std(total_time), np.max(total_time)]
-        avg_errors[k.replace("_estimator", "")] = [
-            np.average((np.array(parameter_results["alpha"]) - pareto_shape) ** 2),
-            np.average((np.array(parameter_results["gamma"]) - pareto_location) ** 2)]
-
-print(avg_results)
-print(avg_errors)
-# with open("experiment_{}.pickle".format(data_quantity), "wb") as handle:
-#     pickle.dump(avg_results, handle, protocol=pickle.HIGHEST_PROTOCOL)
-
-with open("errors_params_{}_{}_samplesize_{}.pickle".format(pareto_shape, pareto_location, data_quantity), "wb") as handle:
-    pickle.dump(avg_errors, handle, protocol=pickle.HIGHEST_PROTOCOL)
-
-# print(results_dict)
+def measure_durations(estimators, data_block):
+    """
+    function to measure computational time of every single estimation, each estimator is evaluated on the samples
+    of each experiment. The loop runs in a function so the timer, estimators and arrays are fast local lookups
+    :param estimators: list of estimator functions
+    :param data_block: samples from pareto distribution, 2-D array holds samples of one experiment per row
+    :return: dictionary where the key is the estimator name and value is numpy.ndarray with durations of single
+    estimations in nanoseconds
+    """
+    timer = perf_counter_ns
+    experiments_number = len(data_block)
+    durations = {estimator.__name__: np.empty(experiments_number) for estimator in estimators}
+    # estimators paired with their arrays to skip the dictionary lookup in the loop
+    timed_estimators = [(estimator, durations[estimator.__name__]) for estimator in estimators]
+    for experiment in range(experiments_number):
+        pareto_data = data_block[experiment]
+        # untimed pass over the samples, so every estimator starts with them in cache and none pays the cold read
+        pareto_data.sum()
+        for estimator, estimator_durations in timed_estimators:
+            start = timer()
+            estimator(pareto_data)
+            estimator_durations[experiment] = timer() - start
+    return durations
+
+
+if __name__ == "__main__":
+    pareto_shape = 5
+    pareto_location = 3
+    experiments_number = 10000
+    data_quantity = 5000
+    # experiments are drawn and evaluated in blocks, so only samples of block_size experiments (and temporaries of
+    # the estimators evaluated on the whole block) are held in memory, i.e. 4 MB for 100 x 5000 float64 samples
+    block_size = 100
+    estimators = [umvue_estimator, ml_estimator, mom_estimator, mm1_estimator, mm2_estimator, mm3_estimator,
+                  mm4_estimator]
+
+    # durations of single estimations in nanoseconds and sums of squared errors [alpha, gamma] for each estimator
+    durations = {estimator.__name__: np.empty(experiments_number) for estimator in estimators}
+    squared_errors = {estimator.__name__: [0.0, 0.0] for estimator in estimators}
+    for block_start in range(0, experiments_number, block_size):
+        block_end = min(block_start + block_size, experiments_number)
+        data_block = get_pareto_data(pareto_shape, pareto_location, (block_end - block_start, data_quantity))
+        block_durations = measure_durations(estimators, data_block)
+        for estimator in estimators:
+            durations[estimator.__name__][block_start:block_end] = block_durations[estimator.__name__]
+            # estimates of all experiments of the block at once
+            alpha, gamma = estimator(data_block)
+            errors = squared_errors[estimator.__name__]
+            errors[0] += ((alpha - pareto_shape) ** 2).sum()
+            errors[1] += ((gamma - pareto_location) ** 2).sum()
+
+        print("Evaluated {:.2%} experiments".format(block_end / experiments_number))
+
+    avg_results = {}
+    avg_errors = {}
+    for estimator in estimators:
+        method = estimator.__name__.replace("_estimator", "")
+        total_time = durations[estimator.__name__] * 1e-9
+        avg_results[method] = [total_time.mean(), total_time.std(), total_time.max()]
+        errors = squared_errors[estimator.__name__]
+        avg_errors[method] = [errors[0] / experiments_number, errors[1] / experiments_number]
+
+    print(avg_results)
+    print(avg_errors)
+    update_pickle("experiments.pickle", data_quantity, avg_results)
+    update_pickle("errors.pickle", (pareto_shape, pareto_location, data_quantity), avg_errors)